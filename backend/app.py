@@ -1,15 +1,20 @@
-import os, subprocess
+import os, subprocess, threading, time, uuid
 from fastapi import FastAPI, Request, Form, Query, HTTPException, Header, Body
-from fastapi.responses import HTMLResponse, PlainTextResponse, FileResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlmodel import select
 from .settings import SETTINGS
 from .db import get_session, init_db
-from .models import ActionLog
+from .models import ActionLog, ReplayRun, AlertLatency
 from .services.pcap import list_pcaps, extract_ips, preview_rows
+from .services.storage import compression_of, plain_name, accepts_encoding, MEDIA_TYPES
+from .services.flows import summarize_flows, flow_rows
+from .services.slicer import slice_pcap
+from .services.download import ranged_file_response
 from .services.rewrite import ensure_rewritten_dir, tcprewrite
 from .services.replay import tcpreplay
-from .services.suricata import remote_tail, test_rules, reload_suricata, write_rule_file, tcpdump_capture
+from .services.suricata import remote_tail, watch_alerts, test_rules, reload_suricata, write_rule_file, tcpdump_capture
+from .services.latency import sent_seconds, expected_from_name, send_timeline, parse_alerts, measure, trend
 
 app = FastAPI()
 templates = Jinja2Templates(directory="backend/templates")
@@ -27,6 +32,95 @@ def _log(action: str, detail: str, rc: int=0, so: str|None=None, se: str|None=No
         row = ActionLog(action=action, detail=detail, exit_code=rc, stdout=so, stderr=se)
         s.add(row); s.commit()
 
+_WATCHES: dict[str, threading.Thread] = {}   # run_id → alert 수집 마무리 스레드 (측정 끝나면 제거)
+
+def _start_watch():
+    """replay 직전 eve.json alert 스트림 구독 → (수신 줄 목록, stop, 스레드, 오류 목록) | None"""
+    if not SETTINGS.latency_watch:
+        return None
+    lines, errors = [], []
+    stop, ready = threading.Event(), threading.Event()
+    def _run():
+        try:
+            watch_alerts(lambda line, at: lines.append((line, at)), stop, ready)
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            ready.set()
+    t = threading.Thread(target=_run, daemon=True)
+    t.start()
+    ready.wait(30)
+    if errors or not t.is_alive():
+        stop.set()
+        _log("latency", "alert watch failed", 1, None, errors[0] if errors else "watch ended early")
+        return None
+    return lines, stop, t, errors
+
+def _finish_watch(run_id: str, watch):
+    """LATENCY_WAIT초 더 받은 뒤 구독 종료 → 송신 타임라인에 매칭해 AlertLatency / ReplayRun 갱신"""
+    lines, stop, t, errors = watch
+    try:
+        time.sleep(SETTINGS.latency_wait)  # 마지막 송신 후 늦게 나오는 alert 대기
+        stop.set()
+        t.join(10)
+        if errors:
+            _log("latency", f"run={run_id} alert watch failed", 1, None, errors[0])
+            return
+        with get_session() as s:
+            run = s.exec(select(ReplayRun).where(ReplayRun.run_id == run_id)).one()
+        frames, times = send_timeline(run.pcap, run.started_at, run.finished_at, run.rate, run.loop, run.sent_seconds)
+        res = measure(run.pcap, frames, times, parse_alerts(lines, SETTINGS.suri_clock_offset_ms),
+                      expected=run.expected, window=SETTINGS.latency_window)
+        with get_session() as s:
+            for a in res["alerts"]:
+                s.add(AlertLatency(run_id=run_id, **a))
+            run = s.exec(select(ReplayRun).where(ReplayRun.run_id == run_id)).one()
+            for k, v in res["summary"].items():
+                setattr(run, k, v)
+            run.measured = True
+            s.add(run); s.commit()
+        sm = res["summary"]
+        _log("latency", f"run={run_id} matched={sm['matched']} missed={sm['missed']} dup={sm['duplicates']} p95={sm['p95_ms']}")
+    except Exception as e:
+        _log("latency", f"run={run_id} measure failed", 1, None, str(e))
+    finally:
+        _WATCHES.pop(run_id, None)
+
+def _replay(path: str, rate: str | None, loop: int, expect: int | None = None):
+    """
+    tcpreplay 실행 + run id / 송신 시각 기록
+    - LATENCY_WATCH=1이면 replay 동안 eve.json alert를 실시간 구독 → 백그라운드에서 탐지 지연 측정
+    """
+    run_id = uuid.uuid4().hex[:12]
+    watch = _start_watch()
+    started = time.time()
+    rc, so, se = tcpreplay(path, iface=SETTINGS.nic_iface, rate=rate, loop=loop)
+    finished = time.time()
+    with get_session() as s:
+        s.add(ReplayRun(run_id=run_id, pcap=path, iface=SETTINGS.nic_iface, rate=rate or None, loop=loop,
+                        exit_code=rc, started_at=started, finished_at=finished, sent_seconds=sent_seconds(so),
+                        expected=expected_from_name(path) if expect is None else int(expect)))
+        s.commit()
+    _log("tcpreplay", f"{path} run={run_id}", rc, so, se)
+    if watch:
+        _WATCHES[run_id] = threading.Thread(target=_finish_watch, args=(run_id, watch), daemon=True)
+        _WATCHES[run_id].start()
+    return run_id, rc, so, se
+
+def _collect_latency(run_id: str):
+    """run의 alert 수집/측정이 끝날 때까지 기다린 뒤 (ReplayRun, AlertLatency 목록)"""
+    t = _WATCHES.get(run_id)
+    if t:
+        t.join()
+    with get_session() as s:
+        run = s.exec(select(ReplayRun).where(ReplayRun.run_id == run_id)).first()
+        if not run:
+            raise HTTPException(404, "unknown run_id")
+        if not run.measured:
+            raise HTTPException(409, "not measured (LATENCY_WATCH=0 or alert watch failed, see /logs)")
+        alerts = s.exec(select(AlertLatency).where(AlertLatency.run_id == run_id).order_by(AlertLatency.alert_at)).all()
+    return run, alerts
+
 # HTML
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
@@ -62,12 +156,47 @@ def pcap_view_table(request: Request, dir: str = Query(...), file: str = Query(.
     rows = preview_rows(full, dfilter=dfilter, count=count)
     return templates.TemplateResponse("pcap_table.html", {"request": request, "rows": rows})
 
-# 파일 다운로드
-@app.get("/pcaps/download")
-def pcap_download(dir: str = Query(...), file: str = Query(...)):
+# 파일 다운로드 (Range/이어받기 지원, 압축본은 해제 없이 그대로 전송)
+@app.api_route("/pcaps/download", methods=["GET", "HEAD"])
+def pcap_download(request: Request, dir: str = Query(...), file: str = Query(...), accept_encoding: str = Header(""),
+                  range: str | None = Header(None), if_range: str | None = Header(None)):
     base = os.path.join(SETTINGS.pcap_root, "" if dir == "." else dir)
     full = os.path.join(base, file)
-    return FileResponse(full, media_type="application/vnd.tcpdump.pcap", filename=file)
+    codec = compression_of(full)
+    if codec and accepts_encoding(accept_encoding, codec):
+        # 클라이언트가 해제 → 평문 .pcap 으로 저장됨
+        return ranged_file_response(full, request.method, range, if_range, "application/vnd.tcpdump.pcap", plain_name(file),
+                                    headers={"Content-Encoding": codec, "Vary": "Accept-Encoding"})
+    if codec:
+        return ranged_file_response(full, request.method, range, if_range, MEDIA_TYPES[codec], file,
+                                    headers={"Vary": "Accept-Encoding"})
+    return ranged_file_response(full, request.method, range, if_range, "application/vnd.tcpdump.pcap", file)
+
+def _slice_response(full: str, where: dict):
+    try:
+        count, chunks = slice_pcap(full, **where)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    name = plain_name(os.path.basename(full))
+    stem, ext = os.path.splitext(name)
+    _log("slice", f"{full} {where} -> {count} frames")
+    return StreamingResponse(chunks, media_type="application/vnd.tcpdump.pcap",
+                             headers={"Content-Disposition": f'attachment; filename="{stem}_slice{ext}"',
+                                      "X-Frame-Count": str(count)})
+
+# 구간 잘라내기 (frame 범위 / 시간 / host·port) — HTML 폼의 빈 칸은 조건 없음
+@app.get("/pcaps/slice")
+def pcap_slice(dir: str = Query(...), file: str = Query(...), start: str = "", end: str = "",
+               t0: str = "", t1: str = "", host: str = "", port: str = ""):
+    base = os.path.join(SETTINGS.pcap_root, "" if dir == "." else dir)
+    full = os.path.join(base, file)
+    try:
+        where = dict(start=int(start) if start else None, end=int(end) if end else None,
+                     t0=float(t0) if t0 else None, t1=float(t1) if t1 else None,
+                     host=host or None, port=int(port) if port else None)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return _slice_response(full, where)
 
 @app.get("/pcaps/ips", response_class=HTMLResponse)
 def pcaps_ips(request: Request, dir: str = Query(...), file: str = Query(...)):
@@ -76,6 +205,20 @@ def pcaps_ips(request: Request, dir: str = Query(...), file: str = Query(...)):
     srcs, dsts = extract_ips(full)
     return templates.TemplateResponse("ips.html", {"request": request, "dir": dir, "file": file, "srcs": srcs, "dsts": dsts})
 
+# 흐름/호스트 요약 페이지
+@app.get("/pcaps/flows", response_class=HTMLResponse)
+def pcaps_flows(request: Request, dir: str = Query(...), file: str = Query(...),
+                sort: str = "bytes", hsort: str = "tx_bytes", limit: int = 100):
+    base = os.path.join(SETTINGS.pcap_root, "" if dir == "." else dir)
+    full = os.path.join(base, file)
+    summary = summarize_flows(full)
+    return templates.TemplateResponse("flows.html", {
+        "request": request, "dir": dir, "file": file, "sort": sort, "hsort": hsort, "limit": limit,
+        "totals": summary["totals"],
+        "flows": flow_rows(summary, "flows", sort, limit),
+        "hosts": flow_rows(summary, "hosts", hsort, limit),
+    })
+
 @app.post("/pcaps/rewrite", response_class=HTMLResponse)
 async def pcaps_rewrite(request: Request, dir: str = Form(...), file: str = Form(...)):
     base = os.path.join(SETTINGS.pcap_root, "" if dir == "." else dir)
@@ -92,9 +235,15 @@ async def pcaps_rewrite(request: Request, dir: str = Form(...), file: str = Form
 def pcaps_replay(request: Request, dir: str = Form(...), file: str = Form(...), loop: int = Form(1), rate: str = Form(None)):
     base = os.path.join(SETTINGS.pcap_root, "" if dir == "." else dir)
     full = os.path.join(base, file)
-    rc, so, se = tcpreplay(full, iface=SETTINGS.nic_iface, rate=rate, loop=loop)
-    _log("tcpreplay", full, rc, so, se)
-    return templates.TemplateResponse("replay_result.html", {"request": request, "stdout": so, "stderr": se})
+    run_id, rc, so, se = _replay(full, rate, loop)
+    return templates.TemplateResponse("replay_result.html", {"request": request, "run_id": run_id, "stdout": so, "stderr": se,
+                                                           "measuring": run_id in _WATCHES})
+
+# 탐지 지연 측정 (HTMX partial)
+@app.post("/latency/collect", response_class=HTMLResponse)
+def latency_collect(request: Request, run_id: str = Form(...)):
+    run, alerts = _collect_latency(run_id)
+    return templates.TemplateResponse("latency_result.html", {"request": request, "run": run, "alerts": alerts})
 
 @app.get("/suricata", response_class=HTMLResponse)
 def suri_page(request: Request):
@@ -141,6 +290,22 @@ def api_pcaps_ips(path: str = Query(...), x_api_key: str = Header(None)):
     srcs, dsts = extract_ips(path)
     return {"srcs": srcs, "dsts": dsts}
 
+@app.get("/api/pcaps/flows")
+def api_pcaps_flows(path: str = Query(...), sort: str = "bytes", hsort: str = "tx_bytes", limit: int = 100,
+                    x_api_key: str = Header(None)):
+    require_key(x_api_key)
+    summary = summarize_flows(path)
+    return {"totals": summary["totals"],
+            "flows": flow_rows(summary, "flows", sort, limit),
+            "hosts": flow_rows(summary, "hosts", hsort, limit)}
+
+@app.get("/api/pcaps/slice")
+def api_pcaps_slice(path: str = Query(...), start: int | None = None, end: int | None = None,
+                    t0: float | None = None, t1: float | None = None, host: str | None = None, port: int | None = None,
+                    x_api_key: str = Header(None)):
+    require_key(x_api_key)
+    return _slice_response(path, dict(start=start, end=end, t0=t0, t1=t1, host=host or None, port=port))
+
 @app.post("/api/pcaps/rewrite")
 def api_pcaps_rewrite(payload: dict = Body(...), x_api_key: str = Header(None)):
     require_key(x_api_key)
@@ -156,9 +321,44 @@ def api_pcaps_rewrite(payload: dict = Body(...), x_api_key: str = Header(None)):
 def api_pcaps_replay(payload: dict = Body(...), x_api_key: str = Header(None)):
     require_key(x_api_key)
     path = payload.get("path"); loop = int(payload.get("loop") or 1); rate = payload.get("rate")
-    rc, so, se = tcpreplay(path, iface=SETTINGS.nic_iface, rate=rate, loop=loop)
-    _log("tcpreplay", path, rc, so, se)
-    return {"rc": rc, "stdout": so, "stderr": se}
+    run_id, rc, so, se = _replay(path, rate, loop, payload.get("expect"))
+    result = {"run_id": run_id, "rc": rc, "stdout": so, "stderr": se}
+    if payload.get("measure") and rc == 0:
+        try:
+            run, _ = _collect_latency(run_id)
+            result["latency"] = run.model_dump()
+        except HTTPException as e:
+            result["latency_error"] = e.detail  # replay 결과는 그대로 반환
+    return result
+
+@app.get("/api/latency/trend")
+def api_latency_trend(pcap: str | None = None, limit: int = 50, x_api_key: str = Header(None)):
+    require_key(x_api_key)
+    q = select(ReplayRun).where(ReplayRun.measured == True)
+    if pcap:
+        q = q.where(ReplayRun.pcap == pcap)
+    with get_session() as s:
+        rows = s.exec(q.order_by(ReplayRun.started_at.desc()).limit(limit)).all()
+    runs = [{"run_id": r.run_id, "pcap": r.pcap, "started_at": r.started_at, "matched": r.matched,
+             "missed": r.missed, "duplicates": r.duplicates, "unmatched": r.unmatched,
+             "p50_ms": r.p50_ms, "p95_ms": r.p95_ms, "p99_ms": r.p99_ms, "max_ms": r.max_ms} for r in reversed(rows)]
+    return trend(runs, factor=SETTINGS.latency_regression)
+
+@app.post("/api/latency/{run_id}/collect")
+def api_latency_collect(run_id: str, x_api_key: str = Header(None)):
+    require_key(x_api_key)
+    run, alerts = _collect_latency(run_id)
+    return {"run": run.model_dump(), "alerts": [a.model_dump() for a in alerts]}
+
+@app.get("/api/latency/{run_id}")
+def api_latency_run(run_id: str, x_api_key: str = Header(None)):
+    require_key(x_api_key)
+    with get_session() as s:
+        run = s.exec(select(ReplayRun).where(ReplayRun.run_id == run_id)).first()
+        if not run:
+            raise HTTPException(404, "unknown run_id")
+        alerts = s.exec(select(AlertLatency).where(AlertLatency.run_id == run_id).order_by(AlertLatency.alert_at)).all()
+        return {"run": run.model_dump(), "alerts": [a.model_dump() for a in alerts]}
 
 @app.get("/api/suricata/logs")
 def api_suri_logs(file: str = Query("fast"), grep: str | None = None, lines: int = 200, x_api_key: str = Header(None)):
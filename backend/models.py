@@ -10,3 +10,43 @@ class ActionLog(SQLModel, table=True):
     stdout: Optional[str] = None
     stderr: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ReplayRun(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: str = Field(index=True, unique=True)
+    pcap: str = Field(index=True)
+    iface: str
+    rate: Optional[str] = None
+    loop: int = 1
+    exit_code: int = 0
+    started_at: float                      # epoch (tcpreplay 실행 직전)
+    finished_at: float                     # epoch (tcpreplay 종료)
+    sent_seconds: Optional[float] = None   # tcpreplay 보고 "sent in X seconds"
+    expected: Optional[int] = None         # 기대 탐지 수 (None=모름)
+    measured: bool = False
+    alerts: int = 0
+    matched: int = 0
+    unmatched: int = 0
+    duplicates: int = 0
+    missed: int = 0
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AlertLatency(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: str = Field(index=True)
+    signature_id: int
+    signature: str
+    src_ip: str
+    src_port: int = 0
+    dest_ip: str
+    dest_port: int = 0
+    proto: str
+    alert_at: float                        # alert 줄 수신 시각 (eve flush + SSH 전송 포함)
+    packet_at: Optional[float] = None      # eve timestamp = 트리거 패킷 캡처 시각 (센서 시계 보정, 매칭 기준)
+    sent_at: Optional[float] = None        # 매칭된 송신 패킷 시각 (없으면 unmatched)
+    latency_ms: Optional[float] = None
+    duplicate: bool = False
@@ -0,0 +1,78 @@
+import hashlib, os, re
+from email.utils import formatdate
+from urllib.parse import quote
+from fastapi import Response
+from fastapi.responses import FileResponse, StreamingResponse
+from .storage import CHUNK
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _validators(st: os.stat_result) -> tuple[str, str]:
+    # FileResponse와 같은 방식 → If-Range 비교가 일관됨
+    etag = hashlib.md5(f"{st.st_mtime}-{st.st_size}".encode(), usedforsecurity=False).hexdigest()
+    return f'"{etag}"', formatdate(st.st_mtime, usegmt=True)
+
+def _disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+def _parse_range(value: str | None, size: int):
+    """단일 바이트 범위만 지원. 반환: (start, end) | None(무시→전체) | 'bad'(416)"""
+    if not value:
+        return None
+    m = RANGE_RE.match(value.strip())
+    if not m or m.group(1) == m.group(2) == "":
+        return None  # 다중 범위/형식 오류는 무시하고 전체 전송
+    if m.group(1) == "":
+        n = int(m.group(2))
+        if n == 0 or size == 0:
+            return "bad"  # 빈 파일엔 만족 가능한 범위 없음
+        return max(size - n, 0), size - 1
+    start = int(m.group(1))
+    if m.group(2) and int(m.group(2)) < start:
+        return None  # last < first는 잘못된 range-spec → 무시 (RFC 9110 §14.1.1)
+    if start >= size:
+        return "bad"
+    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    return start, end
+
+def _read_range(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        left = end - start + 1
+        while left > 0:
+            data = f.read(min(CHUNK, left))
+            if not data:
+                break
+            left -= len(data)
+            yield data
+
+def ranged_file_response(path: str, method: str, range_header: str | None, if_range: str | None,
+                         media_type: str, filename: str, headers: dict | None = None) -> Response:
+    """
+    HTTP Range(단일 범위) + If-Range 지원 파일 응답 → 이어받기/분할 다운로드 가능
+    - Range 없음/무시: 200 FileResponse
+    - 범위 밖: 416
+    """
+    st = os.stat(path)
+    etag, last_modified = _validators(st)
+    headers = {**(headers or {}), "Accept-Ranges": "bytes"}
+    rng = _parse_range(range_header, st.st_size)
+    if if_range and if_range.strip() not in (etag, last_modified):
+        rng = None  # 파일이 바뀜 → 전체 재전송
+    if rng is None:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers, stat_result=st)
+    if rng == "bad":
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+    start, end = rng
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{st.st_size}",
+        "Content-Length": str(end - start + 1),
+        "Content-Disposition": _disposition(filename),
+        "ETag": etag, "Last-Modified": last_modified,
+    })
+    if method == "HEAD":
+        return Response(status_code=206, media_type=media_type, headers=headers)
+    return StreamingResponse(_read_range(path, start, end), status_code=206, media_type=media_type, headers=headers)
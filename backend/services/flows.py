@@ -0,0 +1,214 @@
+import functools, ipaddress, json, os, threading
+import numpy as np
+from .pcapio import iter_batches, decode
+from .storage import cache_dir, cache_key, prune_cache
+
+COMPACT_ROWS = 2_000_000   # 마지막 병합 이후 새 행이 (병합 결과 크기 + 이만큼) 넘게 쌓이면 병합
+FLOWS_VERSION = 2   # 집계 결과가 바뀌면 올릴 것 (pcapio 인덱싱 대상 포함) → 이전 캐시는 재사용하지 않음
+PROTO_NAMES = {1: "icmp", 6: "tcp", 17: "udp", 132: "sctp"}
+
+FLOW_COLS = ("src", "dst", "sport", "dport", "proto", "packets", "bytes",
+             "syn", "fin", "rst", "first", "last", "peak_pps")
+HOST_COLS = ("ip", "tx_packets", "tx_bytes", "rx_packets", "rx_bytes", "flows_out",
+             "peers", "dst_ports", "syn", "first", "last", "peak_pps")
+
+def _reduce(keys: list, sums: dict = None, mins: dict = None, maxs: dict = None):
+    """
+    keys(배열 리스트) 기준 group-by 집계. 결과는 keys 사전순 정렬.
+    반환: (고유 keys 리스트, {컬럼: 집계 배열})
+    """
+    sums, mins, maxs = sums or {}, mins or {}, maxs or {}
+    n = len(keys[0])
+    if n == 0:
+        return keys, {**sums, **mins, **maxs}
+    order = np.lexsort(keys[::-1])
+    ks = [k[order] for k in keys]
+    change = np.zeros(n, dtype=bool)
+    change[0] = True
+    for k in ks:
+        change[1:] |= k[1:] != k[:-1]
+    starts = np.flatnonzero(change)
+    out = {}
+    for name, col in sums.items():
+        out[name] = np.add.reduceat(col[order], starts)
+    for name, col in mins.items():
+        out[name] = np.minimum.reduceat(col[order], starts)
+    for name, col in maxs.items():
+        out[name] = np.maximum.reduceat(col[order], starts)
+    return [k[starts] for k in ks], out
+
+def _merge_flows(parts: list) -> dict:
+    cat = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    (k1, k2), agg = _reduce([cat["k1"], cat["k2"]],
+                            sums={c: cat[c] for c in ("packets", "bytes", "syn", "fin", "rst")},
+                            mins={"first": cat["first"]}, maxs={"last": cat["last"]})
+    return {"k1": k1, "k2": k2, **agg}
+
+def _merge_rates(parts: list) -> dict:
+    cat = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    (k1, k2, sec), agg = _reduce([cat["k1"], cat["k2"], cat["sec"]], sums={"count": cat["count"]})
+    return {"k1": k1, "k2": k2, "sec": sec, **agg}
+
+def _peak_by(keys: list, sec, count):
+    """(keys, sec)별 패킷 수 합 → keys별 최대값 (초당 최대 패킷 수)"""
+    (*ks, _), agg = _reduce([*keys, sec], sums={"count": count})
+    ks2, agg2 = _reduce(ks, maxs={"peak": agg["count"]})
+    return ks2, agg2["peak"]
+
+def _compact(parts: list, merge, merged: int) -> tuple[list, int]:
+    """
+    부분 집계 병합 (병합 결과 행 수를 merged로 추적)
+    - 전체 행이 2 × merged + COMPACT_ROWS를 넘을 때만 → 고유 흐름이 많아도 재정렬 비용은 누적 O(n log n)
+    """
+    if sum(len(p["k1"]) for p in parts) <= 2 * merged + COMPACT_ROWS:
+        return parts, merged
+    m = merge(parts)
+    return [m], len(m["k1"])
+
+def _aggregate(pcap_path: str) -> dict:
+    flows, rates = [], []
+    flows_n = rates_n = 0
+    totals = {"packets": 0, "bytes": 0, "ipv4_packets": 0}
+    first, last = np.inf, -np.inf
+    for b in iter_batches(pcap_path):
+        d = decode(b)
+        totals["packets"] += len(b["ts"])
+        totals["bytes"] += int(b["wirelen"].sum())
+        if np.isfinite(b["ts"]).any():
+            first = min(first, np.nanmin(b["ts"])); last = max(last, np.nanmax(b["ts"]))
+        m = d["ip4"]
+        if not m.any():
+            continue
+        totals["ipv4_packets"] += int(m.sum())
+        k1 = (d["src"][m].astype(np.uint64) << np.uint64(32)) | d["dst"][m].astype(np.uint64)
+        k2 = ((d["sport"][m].astype(np.uint64) << np.uint64(24))
+              | (d["dport"][m].astype(np.uint64) << np.uint64(8)) | d["proto"][m].astype(np.uint64))
+        ts = np.nan_to_num(b["ts"][m], nan=0.0)
+        flags = d["flags"][m].astype(np.int64)
+        flows.append({
+            "k1": k1, "k2": k2,
+            "packets": np.ones(len(k1), dtype=np.int64), "bytes": b["wirelen"][m],
+            "syn": (flags >> 1) & 1, "fin": flags & 1, "rst": (flags >> 2) & 1,
+            "first": ts, "last": ts,
+        })
+        rates.append({"k1": k1, "k2": k2, "sec": np.floor(ts).astype(np.int64),
+                      "count": np.ones(len(k1), dtype=np.int64)})
+        flows, flows_n = _compact(flows, _merge_flows, flows_n)
+        rates, rates_n = _compact(rates, _merge_rates, rates_n)
+    return _finish(flows, rates, totals, first, last)
+
+def _finish(flows: list, rates: list, totals: dict, first: float, last: float) -> dict:
+    if not flows:
+        empty_f = {c: np.zeros(0) for c in FLOW_COLS}
+        empty_h = {c: np.zeros(0) for c in HOST_COLS}
+        return {"flows": empty_f, "hosts": empty_h, "totals": _totals(totals, first, last, 0, 0, 0)}
+    f = _merge_flows(flows)
+    r = _merge_rates(rates)
+    k1, k2 = f["k1"], f["k2"]
+    src = (k1 >> np.uint64(32)).astype(np.uint32)
+    dst = (k1 & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    _, peak = _peak_by([r["k1"], r["k2"]], r["sec"], r["count"])  # flows와 같은 (k1,k2) 정렬
+    flow_t = {
+        "src": src, "dst": dst,
+        "sport": ((k2 >> np.uint64(24)) & np.uint64(0xFFFF)).astype(np.uint16),
+        "dport": ((k2 >> np.uint64(8)) & np.uint64(0xFFFF)).astype(np.uint16),
+        "proto": (k2 & np.uint64(0xFF)).astype(np.uint8),
+        "packets": f["packets"], "bytes": f["bytes"],
+        "syn": f["syn"], "fin": f["fin"], "rst": f["rst"],
+        "first": f["first"], "last": f["last"], "peak_pps": peak,
+    }
+    host_t = _hosts(flow_t, r)
+    # 전체 초당 최대 패킷 수
+    _, per_sec = _reduce([r["sec"]], sums={"count": r["count"]})
+    return {"flows": flow_t, "hosts": host_t,
+            "totals": _totals(totals, first, last, len(src), len(host_t["ip"]), int(per_sec["count"].max()))}
+
+def _hosts(ft: dict, r: dict) -> dict:
+    src, dst = ft["src"], ft["dst"]
+    ips = np.unique(np.concatenate([src, dst]))
+    idx_s, idx_d = np.searchsorted(ips, src), np.searchsorted(ips, dst)
+    n = len(ips)
+
+    def add(idx, col):
+        return np.bincount(idx, weights=col, minlength=n).astype(np.int64)
+
+    first = np.full(n, np.inf); last = np.full(n, -np.inf)
+    for idx in (idx_s, idx_d):
+        np.minimum.at(first, idx, ft["first"]); np.maximum.at(last, idx, ft["last"])
+    pairs = np.unique((src.astype(np.uint64) << np.uint64(32)) | dst.astype(np.uint64))
+    ports = np.unique((src.astype(np.uint64) << np.uint64(16)) | ft["dport"].astype(np.uint64))
+    # 호스트 관여 패킷의 초당 최대치 (src==dst 자기 자신 흐름은 한 번만)
+    rs = (r["k1"] >> np.uint64(32)).astype(np.uint32)
+    rd = (r["k1"] & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+    other = rs != rd
+    (hip,), peak = _peak_by([np.concatenate([rs, rd[other]])],
+                            np.concatenate([r["sec"], r["sec"][other]]),
+                            np.concatenate([r["count"], r["count"][other]]))
+    return {
+        "ip": ips,
+        "tx_packets": add(idx_s, ft["packets"]), "tx_bytes": add(idx_s, ft["bytes"]),
+        "rx_packets": add(idx_d, ft["packets"]), "rx_bytes": add(idx_d, ft["bytes"]),
+        "flows_out": np.bincount(idx_s, minlength=n),
+        "peers": np.bincount(np.searchsorted(ips, (pairs >> np.uint64(32)).astype(np.uint32)), minlength=n),
+        "dst_ports": np.bincount(np.searchsorted(ips, (ports >> np.uint64(16)).astype(np.uint32)), minlength=n),
+        "syn": add(idx_s, ft["syn"]),
+        "first": first, "last": last,
+        "peak_pps": peak[np.searchsorted(hip, ips)],
+    }
+
+def _totals(t: dict, first: float, last: float, flows: int, hosts: int, peak: int) -> dict:
+    ok = np.isfinite(first)
+    return {**t, "non_ip_packets": t["packets"] - t["ipv4_packets"],
+            "first": float(first) if ok else None, "last": float(last) if ok else None,
+            "duration": float(last - first) if ok else 0.0,
+            "flows": flows, "hosts": hosts, "peak_pps": peak}
+
+@functools.lru_cache(maxsize=8)
+def _load(npz_path: str) -> dict:
+    with np.load(npz_path) as z:
+        out = {"flows": {}, "hosts": {}, "totals": json.loads(str(z["totals"]))}
+        for name in z.files:
+            table, _, col = name.partition(".")
+            if col:
+                out[table][col] = z[name]
+    return out
+
+def summarize_flows(pcap_path: str) -> dict:
+    """
+    단일 패스 흐름 집계 (5-tuple별 / 호스트별 컬럼 배열 + totals)
+    - 결과는 파일별 .npz 캐시 (원본 크기/mtime 바뀌면 재계산)
+    - IPv4만 흐름으로 집계, 나머지는 totals.non_ip_packets
+    """
+    d = cache_dir(f"flows-v{FLOWS_VERSION}")
+    target = d / f"{cache_key(pcap_path)}.npz"
+    if target.exists():
+        os.utime(target)
+        return _load(str(target))
+    s = _aggregate(pcap_path)
+    arrays = {f"{t}.{c}": v for t in ("flows", "hosts") for c, v in s[t].items()}
+    tmp = d / f".{target.name}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp, "wb") as fh:
+        np.savez(fh, totals=np.array(json.dumps(s["totals"])), **arrays)
+    os.replace(tmp, target)
+    prune_cache(keep=target)
+    return _load(str(target))
+
+def _cell(col: str, v):
+    if col in ("src", "dst", "ip"):
+        return str(ipaddress.IPv4Address(int(v)))
+    if col == "proto":
+        return PROTO_NAMES.get(int(v), str(int(v)))
+    if col in ("first", "last"):
+        return float(v)
+    return int(v)
+
+def flow_rows(summary: dict, table: str = "flows", sort: str | None = None, limit: int = 100):
+    """summary의 flows/hosts 테이블을 sort 컬럼 내림차순 상위 limit개 dict 리스트로"""
+    cols = FLOW_COLS if table == "flows" else HOST_COLS
+    t = summary[table]
+    if sort not in cols or sort in ("src", "dst", "ip", "proto"):
+        sort = "bytes" if table == "flows" else "tx_bytes"
+    if not len(t[sort]):
+        return []
+    order = np.argsort(-t[sort].astype(np.float64), kind="stable")[:max(limit, 0)]
+    return [{c: _cell(c, t[c][i]) for c in cols} for i in order]
@@ -0,0 +1,186 @@
+import ipaddress, json, re, statistics
+from datetime import datetime
+import numpy as np
+from .slicer import frame_index
+
+PROTO_NUMS = {"ICMP": 1, "TCP": 6, "UDP": 17, "SCTP": 132}
+SENT_RE = re.compile(r"Actual:\s*\d+ packets \(\d+ bytes\) sent in ([\d.]+) seconds")
+
+def sent_seconds(stdout: str | None) -> float | None:
+    """tcpreplay 출력의 'Actual: ... sent in X seconds' → X"""
+    m = SENT_RE.search(stdout or "")
+    return float(m.group(1)) if m else None
+
+def expected_from_name(pcap_path: str) -> int | None:
+    """생성기 파일명 규칙: *_no_trigger* → 0, *trigger* → 1, 그 외 모름"""
+    name = pcap_path.lower()
+    if "no_trigger" in name:
+        return 0
+    if "trigger" in name:
+        return 1
+    return None
+
+def send_timeline(pcap_path: str, started_at: float, finished_at: float,
+                  rate: str | None = None, loop: int = 1, sent: float | None = None):
+    """
+    프레임별 송신 시각(epoch) 추정 → (프레임 인덱스 배열, 시각 배열), loop 반복 포함
+    - rate 없음: 캡처 타이밍 그대로 / rate(Mbps): 누적 바이트 기준
+    - tcpreplay가 보고한 실제 송신 시간(sent)이 있으면 그 길이에 맞춰 늘이고 끝 시각에 정렬
+    """
+    idx = frame_index(pcap_path)
+    n = len(idx["ts"])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    if rate:
+        bits = np.r_[0, np.cumsum(idx["caplen"][:-1])] * 8.0
+        rel = bits / (float(rate) * 1e6)
+    else:
+        ts = idx["ts"]
+        ts = np.where(np.isfinite(ts), ts, np.nanmin(ts) if np.isfinite(ts).any() else 0.0)
+        rel = ts - ts[0]
+    loop = max(int(loop or 1), 1)
+    # 다음 loop의 첫 패킷은 직전 loop 마지막 패킷 + 평균 패킷 간격 뒤에 나감
+    span = float(rel.max())
+    period = span + (span / (n - 1) if n > 1 else 0.0)
+    rel = np.concatenate([rel + k * period for k in range(loop)])
+    total = float(rel.max())
+    start = started_at
+    if sent:
+        if total > 0:
+            rel = rel * (sent / total)
+        start = finished_at - sent
+    return np.tile(np.arange(n), loop), start + rel
+
+def parse_alerts(lines, clock_offset_ms: float = 0.0) -> list[dict]:
+    """
+    (eve.json alert 줄, 도착 시각) 목록 → dict
+    - alert_at: 이 서버에서 alert 줄을 받은 시각 (탐지 시각, 송신 타임라인과 같은 시계)
+    - packet_at: eve "timestamp" = 트리거 패킷의 캡처 시각 (센서 시계 오프셋 보정, 참고용)
+    """
+    out = []
+    for line, seen_at in lines:
+        try:
+            ev = json.loads(line)
+        except ValueError:
+            continue
+        if ev.get("event_type") != "alert":
+            continue
+        try:
+            at = datetime.strptime(ev["timestamp"], "%Y-%m-%dT%H:%M:%S.%f%z").timestamp()
+        except (KeyError, ValueError):
+            at = None
+        al = ev.get("alert") or {}
+        out.append({
+            "signature_id": int(al.get("signature_id") or 0),
+            "signature": al.get("signature") or "",
+            "src_ip": ev.get("src_ip", ""), "src_port": int(ev.get("src_port") or 0),
+            "dest_ip": ev.get("dest_ip", ""), "dest_port": int(ev.get("dest_port") or 0),
+            "proto": str(ev.get("proto", "")),
+            "alert_at": seen_at,
+            "packet_at": at - clock_offset_ms / 1000.0 if at is not None else None,
+        })
+    return sorted(out, key=lambda a: a["alert_at"])
+
+def _flow_key(src: str, dst: str, sport: int, dport: int, proto: str):
+    try:
+        s, d = int(ipaddress.IPv4Address(src)), int(ipaddress.IPv4Address(dst))
+    except ValueError:
+        return None  # IPv6 등은 인덱스에 없음
+    p = PROTO_NUMS.get(proto.upper()) if not proto.isdigit() else int(proto)
+    if p is None:
+        return None
+    return (s << 32) | d, (sport << 24) | (dport << 8) | p
+
+class _SendLookup:
+    """(5-tuple, 시각) 정렬 배열 → 5-tuple의 특정 시각 기준 송신 시각을 O(log n)으로"""
+
+    def __init__(self, idx: dict, frames, times):
+        k1 = (idx["src"][frames].astype(np.uint64) << np.uint64(32)) | idx["dst"][frames].astype(np.uint64)
+        k2 = ((idx["sport"][frames].astype(np.uint64) << np.uint64(24))
+              | (idx["dport"][frames].astype(np.uint64) << np.uint64(8)) | idx["proto"][frames].astype(np.uint64))
+        order = np.lexsort((times, k2, k1))
+        self.k1, self.k2, self.t = k1[order], k2[order], times[order]
+
+    def _span(self, key):
+        k1, k2 = np.uint64(key[0]), np.uint64(key[1])
+        a, b = np.searchsorted(self.k1, k1, "left"), np.searchsorted(self.k1, k1, "right")
+        return a + np.searchsorted(self.k2[a:b], k2, "left"), a + np.searchsorted(self.k2[a:b], k2, "right")
+
+    def before(self, key, at: float) -> float | None:
+        """at 직전 송신 (전부 at 이후면 첫 송신 → 시계 오차로 음수 지연)"""
+        a, b = self._span(key)
+        if a == b:
+            return None
+        i = a + np.searchsorted(self.t[a:b], at, "right") - 1
+        return float(self.t[max(i, a)])
+
+    def nearest(self, key, at: float) -> float | None:
+        """at에 가장 가까운 송신"""
+        a, b = self._span(key)
+        if a == b:
+            return None
+        i = a + np.searchsorted(self.t[a:b], at)
+        near = self.t[max(i - 1, a):min(i + 1, b)]
+        return float(near[np.argmin(np.abs(near - at))])
+
+def measure(pcap_path: str, frames, times, alerts: list[dict], expected: int | None = None,
+            window: float = 30.0) -> dict:
+    """
+    알림을 5-tuple(양방향) + 시각으로 송신 패킷에 매칭해 탐지 지연(alert_at - 송신 시각) 계산
+    - 트리거 패킷: packet_at에 가장 가까운 송신, packet_at이 없으면 alert_at 직전 송신
+    - 같은 (sid, 5-tuple)의 두 번째 이후 알림은 duplicate (백분위에서 제외)
+    - missed = 기대 탐지 수 - 매칭된 고유 탐지 수
+    """
+    summary = {"alerts": 0, "matched": 0, "unmatched": 0, "duplicates": 0, "missed": 0,
+               "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    rows = []
+    if len(times):
+        lo, hi = float(times.min()) - 1.0, float(times.max()) + window
+        lookup = _SendLookup(frame_index(pcap_path), frames, times)
+        seen = set()
+        for a in alerts:
+            if not lo <= a["alert_at"] <= hi:
+                continue
+            row = {**a, "sent_at": None, "latency_ms": None, "duplicate": False}
+            fwd = _flow_key(a["src_ip"], a["dest_ip"], a["src_port"], a["dest_port"], a["proto"])
+            rev = _flow_key(a["dest_ip"], a["src_ip"], a["dest_port"], a["src_port"], a["proto"])
+            keys = [k for k in (fwd, rev) if k]
+            if a.get("packet_at") is not None:
+                # 트리거 패킷 = 캡처 시각(packet_at)에 가장 가까운 송신 (같은 흐름의 뒤 패킷과 혼동 방지)
+                sends = [t for t in (lookup.nearest(k, a["packet_at"]) for k in keys) if t is not None]
+                sent = min(sends, key=lambda t: abs(t - a["packet_at"])) if sends else None
+            else:
+                sent = next((t for t in (lookup.before(k, a["alert_at"]) for k in keys) if t is not None), None)
+            if sent is not None:
+                row["sent_at"], row["latency_ms"] = sent, (a["alert_at"] - sent) * 1000.0
+            tag = (a["signature_id"], *sorted([(a["src_ip"], a["src_port"]), (a["dest_ip"], a["dest_port"])]), a["proto"])
+            if row["sent_at"] is not None:
+                row["duplicate"] = tag in seen
+                seen.add(tag)
+            rows.append(row)
+    lat = [r["latency_ms"] for r in rows if r["sent_at"] is not None and not r["duplicate"]]
+    summary["alerts"] = len(rows)
+    summary["matched"] = len(lat)
+    summary["unmatched"] = sum(1 for r in rows if r["sent_at"] is None)
+    summary["duplicates"] = sum(1 for r in rows if r["duplicate"])
+    if expected is not None:
+        summary["missed"] = max(expected - len(lat), 0)
+    if lat:
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        summary.update(p50_ms=float(p50), p95_ms=float(p95), p99_ms=float(p99), max_ms=float(max(lat)))
+    return {"summary": summary, "alerts": rows}
+
+def trend(runs: list[dict], factor: float = 1.5, baseline_runs: int = 10) -> list[dict]:
+    """
+    측정된 run(시간순)마다 직전 baseline_runs개의 p95 중앙값을 기준선으로,
+    p95가 기준선 × factor를 넘으면 regression=True
+    """
+    out, history = [], []
+    for r in runs:
+        base = statistics.median(history[-baseline_runs:]) if history else None
+        p95 = r.get("p95_ms")
+        out.append({**r, "baseline_p95_ms": base,
+                    "regression": bool(base is not None and p95 is not None and p95 > base * factor)})
+        if p95 is not None:
+            history.append(p95)
+    return out
@@ -1,19 +1,20 @@
-import subprocess, os, shlex
+import os
 from ..settings import SETTINGS
+from .storage import is_pcap, input_arg, run_with_input
 
 def list_pcaps():
     root = SETTINGS.pcap_root
     tree = []
     for dirpath, dirnames, filenames in os.walk(root):
         rel = os.path.relpath(dirpath, root)
-        files = [f for f in filenames if f.lower().endswith((".pcap",".pcapng"))]
+        files = [f for f in filenames if is_pcap(f)]
         if files:
             tree.append({"dir": rel, "files": sorted(files)})
     return sorted(tree, key=lambda x: x["dir"])
 
 def extract_ips(pcap_path: str):
-    cmd = f'tshark -r {shlex.quote(pcap_path)} -T fields -e ip.src -e ip.dst'
-    out = subprocess.run(cmd, shell=True, capture_output=True, text=True)
+    cmd = ["tshark", "-r", input_arg(pcap_path), "-T", "fields", "-e", "ip.src", "-e", "ip.dst"]
+    out = run_with_input(cmd, pcap_path)
     if out.returncode != 0:
         raise RuntimeError(out.stderr)
     srcs, dsts = set(), set()
@@ -29,8 +30,8 @@ def preview_rows(pcap_path: str, dfilter: str | None = None, count: int = 100):
     """
     tshark로 가벼운 컬럼만 추출해서 테이블 형태로 반환
     - 구분자: 파이프(|) → 파싱 확실
+    - .pcap.gz/.pcap.zst는 stdin 스트리밍으로 읽음
     """
-    import subprocess
     fields = [
         "frame.number",
         "frame.time_relative",
@@ -41,7 +42,7 @@ def preview_rows(pcap_path: str, dfilter: str | None = None, count: int = 100):
     ]
     sep = "|"  # ← 핵심: 파이프를 구분자로 사용
     cmd = [
-        "tshark", "-r", pcap_path, "-n",
+        "tshark", "-r", input_arg(pcap_path), "-n",
         "-T", "fields",
         "-E", f"separator={sep}",
         "-E", "occurrence=f",
@@ -53,7 +54,7 @@ def preview_rows(pcap_path: str, dfilter: str | None = None, count: int = 100):
     if count:
         cmd += ["-c", str(count)]
 
-    p = subprocess.run(cmd, capture_output=True, text=True)
+    p = run_with_input(cmd, pcap_path)
     if p.returncode != 0:
         raise RuntimeError(p.stderr or "tshark failed")
 
@@ -1,8 +1,10 @@
 import subprocess
 from ..settings import SETTINGS
+from .storage import materialize
 
 def tcpreplay(pcap_path: str, iface: str=None, rate: str=None, loop: int=1):
     iface = iface or SETTINGS.nic_iface
+    pcap_path = materialize(pcap_path)  # 압축본은 해제 캐시 경로로 (--loop 재읽기 필요)
     args = ["tcpreplay", "--intf1", iface, "--loop", str(loop), pcap_path]
     if rate:
         args.insert(1, f"--mbps={rate}")
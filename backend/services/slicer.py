@@ -0,0 +1,118 @@
+import functools, ipaddress, os, threading
+import numpy as np
+from .pcapio import iter_batches, decode, PCAPNG_SHB
+from .storage import cache_dir, cache_key, prune_cache, materialize, CHUNK
+
+INDEX_COLS = ("offset", "reclen", "caplen", "ts", "src", "dst", "sport", "dport", "proto")
+INDEX_VERSION = 3   # INDEX_COLS나 인덱싱 대상 블록이 바뀌면 올릴 것 → 이전 캐시는 재사용하지 않음
+
+def _build_index(pcap_path: str) -> dict:
+    parts = {c: [] for c in INDEX_COLS}
+    for b in iter_batches(pcap_path):
+        d = decode(b)
+        for c in ("offset", "reclen", "caplen", "ts"):
+            parts[c].append(b[c])
+        for c in ("src", "dst", "sport", "dport", "proto"):
+            parts[c].append(d[c])
+    if not parts["offset"]:
+        return {c: np.zeros(0, dtype=np.int64) for c in INDEX_COLS}
+    return {c: np.concatenate(v) for c, v in parts.items()}
+
+@functools.lru_cache(maxsize=4)
+def _load(npz_path: str) -> dict:
+    with np.load(npz_path) as z:
+        return {c: z[c] for c in z.files}
+
+def frame_index(pcap_path: str) -> dict:
+    """
+    프레임 오프셋 인덱스 (프레임 i → 해제된 파일 내 레코드 위치/길이 + 5-tuple/ts)
+    - 파일별 .npz 캐시, 원본 크기/mtime 바뀌면 재생성
+    """
+    d = cache_dir(f"index-v{INDEX_VERSION}")
+    target = d / f"{cache_key(pcap_path)}.npz"
+    if target.exists():
+        os.utime(target)
+        return _load(str(target))
+    idx = _build_index(pcap_path)
+    tmp = d / f".{target.name}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp, "wb") as fh:
+        np.savez(fh, **idx)
+    os.replace(tmp, target)
+    prune_cache(keep=target)
+    return _load(str(target))
+
+def select_frames(idx: dict, start: int | None = None, end: int | None = None,
+                  t0: float | None = None, t1: float | None = None,
+                  host: str | None = None, port: int | None = None):
+    """
+    조건에 맞는 프레임의 0-based 인덱스 배열
+    - start/end: frame.number (1부터, end 포함)
+    - t0/t1: frame.time_relative (초, 첫 패킷 기준)
+    - host/port: src/dst 어느 쪽이든 일치 (IPv4)
+    """
+    if start is not None and start < 1:
+        raise ValueError("start must be >= 1 (frame numbers start at 1)")
+    if end is not None and end < (start if start is not None else 1):
+        raise ValueError("end must be >= start")
+    n = len(idx["offset"])
+    lo = start - 1 if start is not None else 0
+    hi = min(end, n) if end is not None else n
+    mask = np.zeros(n, dtype=bool)
+    mask[lo:hi] = True
+    if t0 is not None or t1 is not None:
+        ts = idx["ts"]
+        rel = ts - np.nanmin(ts) if n else ts
+        if t0 is not None:
+            mask &= rel >= t0
+        if t1 is not None:
+            mask &= rel <= t1
+    if host:
+        ip = int(ipaddress.IPv4Address(host))
+        mask &= (idx["src"] == ip) | (idx["dst"] == ip)
+    if port is not None:
+        mask &= (idx["sport"] == port) | (idx["dport"] == port)
+    return np.flatnonzero(mask)
+
+def _runs(idx: dict, frames):
+    """연속 레코드를 묶어 (시작 오프셋, 길이) 목록으로 → seek/read 횟수 최소화"""
+    if not len(frames):
+        return []
+    off, ln = idx["offset"][frames], idx["reclen"][frames]
+    brk = np.flatnonzero(off[1:] != off[:-1] + ln[:-1]) + 1
+    starts = np.r_[0, brk]
+    ends = np.r_[brk, len(frames)] - 1
+    return list(zip(off[starts].tolist(), (off[ends] + ln[ends] - off[starts]).tolist()))
+
+def _meta_regions(idx: dict, size: int):
+    """pcapng에서 패킷 블록(PB/SPB/EPB 전부 인덱스됨) 사이 구간 = SHB/IDB 등 비패킷 블록 → 원래 위치 그대로 유지"""
+    off, ln = idx["offset"], idx["reclen"]
+    gs, ge = np.r_[0, off + ln], np.r_[off, size]
+    keep = ge > gs
+    return list(zip(gs[keep].tolist(), (ge - gs)[keep].tolist()))
+
+def _stream(plain: str, regions: list):
+    with open(plain, "rb") as f:
+        for off, length in regions:
+            f.seek(off)
+            while length > 0:
+                data = f.read(min(CHUNK, length))
+                if not data:
+                    break
+                length -= len(data)
+                yield data
+
+def slice_pcap(pcap_path: str, **where):
+    """
+    조건에 맞는 패킷만 담은 새 pcap → (프레임 수, 바이트 청크 제너레이터)
+    - pcap: 파일 헤더 + 선택 레코드 원본 그대로
+    - pcapng: 모든 비패킷 블록(중간에 나오는 SHB/IDB 포함)을 원래 순서대로 + 선택 블록
+    - 압축본은 해제 캐시 파일에서 seek
+    - 조건 오류(잘못된 IP 등)는 스트림 시작 전에 ValueError
+    """
+    idx = frame_index(pcap_path)
+    frames = select_frames(idx, **where)
+    plain = materialize(pcap_path)
+    with open(plain, "rb") as f:
+        pcapng = f.read(4) == PCAPNG_SHB
+    meta = _meta_regions(idx, os.path.getsize(plain)) if pcapng else [(0, 24)]
+    return len(frames), _stream(plain, sorted(meta + _runs(idx, frames)))
@@ -1,5 +1,5 @@
 # backend/services/ssh.py
-import paramiko, os
+import paramiko, os, socket, time
 
 def _load_pkey(path, passphrase=None):
     if not path:
@@ -45,6 +45,39 @@ def run(host, user, key_path, cmd, timeout=30, passphrase=None, password=None):
     finally:
         cli.close()
 
+def stream_lines(host, user, key_path, cmd, on_line, stop, ready=None, settle=0.5, passphrase=None, password=None):
+    """
+    원격 명령 출력을 줄 단위로 받는 즉시 on_line(line, 도착 시각 epoch) 호출, stop(Event) 설정 시 종료
+    - pty 할당 → 채널을 닫으면 원격 프로세스도 SIGHUP으로 정리됨
+    - 명령 시작 후 settle초 뒤 ready(Event) 설정 (원격 tail이 파일을 열 시간)
+    """
+    from ..settings import SETTINGS
+    cli = _client(host, user, key_path, passphrase or SETTINGS.suri_passphrase, password or SETTINGS.suri_password)
+    try:
+        chan = cli.get_transport().open_session()
+        chan.get_pty()
+        chan.settimeout(0.1)
+        chan.exec_command(cmd)
+        time.sleep(settle)
+        if ready is not None:
+            ready.set()
+        buf = b""
+        while not stop.is_set():
+            try:
+                data = chan.recv(65536)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            now = time.time()
+            buf += data
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                on_line(line.decode(errors="replace").rstrip("\r"), now)
+        return chan.exit_status if chan.exit_status_ready() else 0
+    finally:
+        cli.close()
+
 # ★ 추가: 원격 파일 쓰기(SFTP)
 def sftp_write(host, user, key_path, remote_path, data: bytes, passphrase=None, password=None):
     from ..settings import SETTINGS
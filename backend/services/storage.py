@@ -0,0 +1,155 @@
+import gzip, hashlib, os, pathlib, shutil, subprocess, threading
+from ..settings import SETTINGS
+
+# 라이브러리에서 인식하는 pcap 확장자 (압축본 포함)
+PLAIN_EXTS = (".pcap", ".pcapng")
+COMPRESSED_EXTS = {".gz": "gzip", ".zst": "zstd"}
+PCAP_EXTS = PLAIN_EXTS + tuple(e + c for e in PLAIN_EXTS for c in COMPRESSED_EXTS)
+
+MEDIA_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+CHUNK = 1024 * 1024
+
+def is_pcap(name: str) -> bool:
+    return name.lower().endswith(PCAP_EXTS)
+
+def compression_of(path: str) -> str | None:
+    """압축 pcap이면 'gzip' / 'zstd', 아니면 None"""
+    name = path.lower()
+    for ext, codec in COMPRESSED_EXTS.items():
+        if name.endswith(ext) and name[:-len(ext)].endswith(PLAIN_EXTS):
+            return codec
+    return None
+
+def plain_name(name: str) -> str:
+    """foo.pcap.gz -> foo.pcap (압축이 아니면 그대로)"""
+    codec = compression_of(name)
+    if not codec:
+        return name
+    for ext, c in COMPRESSED_EXTS.items():
+        if c == codec:
+            return name[:-len(ext)]
+    return name
+
+def accepts_encoding(header: str | None, codec: str) -> bool:
+    """Accept-Encoding 헤더가 codec을 q>0으로 허용하는지 (codec이 명시되면 그 q가 * 보다 우선)"""
+    qs = {}
+    for token in (header or "").lower().split(","):
+        name, *params = [t.strip() for t in token.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for prm in params:
+            k, _, v = prm.partition("=")
+            if k.strip() == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        qs[name] = max(q, qs.get(name, 0.0))
+    q = qs.get(codec, qs.get("*", 0.0))
+    return q > 0
+
+def open_pcap(path: str):
+    """
+    pcap을 바이너리 스트림으로 연다. 압축본은 스트리밍 해제(임시파일 없음).
+    """
+    codec = compression_of(path)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstandard 패키지가 필요합니다: pip install zstandard")
+        fh = open(path, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(fh, closefd=True)
+    return open(path, "rb")
+
+def input_arg(path: str) -> str:
+    """외부 도구(tshark/tcprewrite)에 넘길 입력 경로. 압축본이면 stdin('-')"""
+    return "-" if compression_of(path) else path
+
+def _pump(path: str, pipe):
+    try:
+        with open_pcap(path) as src:
+            shutil.copyfileobj(src, pipe, CHUNK)
+    except (BrokenPipeError, OSError):
+        # tshark -c 처럼 소비자가 먼저 끝나면 파이프가 닫힘 → 정상
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+def run_with_input(args: list[str], path: str) -> subprocess.CompletedProcess:
+    """
+    args를 실행하되, path가 압축본이면 해제 스트림을 stdin으로 흘려보낸다.
+    args 안의 입력 경로는 input_arg(path)로 만들어 둘 것.
+    """
+    if not compression_of(path):
+        return subprocess.run(args, capture_output=True, text=True)
+    proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdin, proc.stdin = proc.stdin, None  # communicate()가 stdin을 닫지 않도록 분리
+    feeder = threading.Thread(target=_pump, args=(path, stdin), daemon=True)
+    feeder.start()
+    out, err = proc.communicate()
+    feeder.join()
+    return subprocess.CompletedProcess(args, proc.returncode,
+                                       out.decode(errors="replace"), err.decode(errors="replace"))
+
+# ---- 해제 캐시 (tcpreplay처럼 seek/반복 읽기가 필요한 소비자용) ----
+
+def cache_dir(kind: str) -> pathlib.Path:
+    d = pathlib.Path(SETTINGS.pcap_cache_dir).expanduser() / kind
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def cache_key(path: str) -> str:
+    """경로 + 크기 + mtime 기반 키 → 원본이 바뀌면 자동 무효화"""
+    st = os.stat(path)
+    raw = f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+def prune_cache(keep: pathlib.Path):
+    """
+    PCAP_CACHE_DIR 전체(plain/flows/index 등)를 PCAP_CACHE_MAX_MB 하나의 한도로 정리
+    - 가장 오래 안 쓴 것부터 제거 (LRU: mtime을 접근 시각으로 갱신함)
+    """
+    root = pathlib.Path(SETTINGS.pcap_cache_dir).expanduser()
+    limit = SETTINGS.pcap_cache_max_mb * 1024 * 1024
+    entries = []
+    for p in root.glob("*/*"):
+        if p.name.startswith("."):
+            continue  # 작성 중인 .part 파일
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue  # 다른 요청이 방금 지움
+        entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries, key=lambda e: e[0]):
+        if total <= limit:
+            break
+        if p == keep:
+            continue
+        total -= size
+        p.unlink(missing_ok=True)
+
+def materialize(path: str) -> str:
+    """
+    압축 pcap을 크기 제한 캐시에 해제해 경로를 돌려준다. 평문 pcap은 그대로.
+    """
+    if not compression_of(path):
+        return path
+    d = cache_dir("plain")
+    target = d / f"{cache_key(path)}_{plain_name(os.path.basename(path))}"
+    if target.exists():
+        os.utime(target)
+        return str(target)
+    tmp = d / f".{target.name}.{os.getpid()}.{threading.get_ident()}.part"
+    with open_pcap(path) as src, open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK)
+    os.replace(tmp, target)
+    prune_cache(keep=target)
+    return str(target)
@@ -1,6 +1,6 @@
 # backend/services/suricata.py
 import shlex
-from .ssh import run, sftp_write
+from .ssh import run, sftp_write, stream_lines
 from ..settings import SETTINGS
 
 def remote_tail(file_path: str, grep: str=None, lines: int=100):
@@ -9,6 +9,11 @@ def remote_tail(file_path: str, grep: str=None, lines: int=100):
         cmd = f"grep -i {shlex.quote(grep)} {shlex.quote(file_path)} | tail -n {int(lines)}"
     return run(SETTINGS.suri_host, SETTINGS.suri_user, SETTINGS.suri_key, cmd)
 
+def watch_alerts(on_line, stop, ready=None):
+    """eve.json에 새로 추가되는 alert 줄을 도착 즉시 on_line(line, 도착 시각)으로 (stop 설정 시 종료)"""
+    cmd = f"tail -n 0 -F {shlex.quote(SETTINGS.suri_eve)} | grep --line-buffered -F '\"event_type\":\"alert\"'"
+    return stream_lines(SETTINGS.suri_host, SETTINGS.suri_user, SETTINGS.suri_key, cmd, on_line, stop, ready)
+
 def test_rules():
     return run(SETTINGS.suri_host, SETTINGS.suri_user, SETTINGS.suri_key, SETTINGS.suri_test_cmd)
 
@@ -8,6 +8,8 @@ class Settings(BaseModel):
     pcap_root: str = os.getenv("PCAP_ROOT", "/home/llm/pcaps")
     nic_iface: str = os.getenv("NIC_IFACE", "eth0")
     use_sudo_replay: bool = os.getenv("USE_SUDO_REPLAY", "0") == "1"
+    pcap_cache_dir: str = os.getenv("PCAP_CACHE_DIR", "/tmp/suri_pcap_cache")
+    pcap_cache_max_mb: int = int(os.getenv("PCAP_CACHE_MAX_MB", "2048"))
 
     api_key: str = os.getenv("API_KEY", "devkey")
 
@@ -23,6 +25,12 @@ class Settings(BaseModel):
     suri_local_rule: str = os.getenv("SURICATA_LOCAL_RULE", "local.rules")
     suri_test_cmd: str = os.getenv("SURICATA_TEST_CMD", "suricata -T -S /etc/suricata/rules/local.rules")
     suri_reload_cmd: str = os.getenv("SURICATA_RELOAD_CMD", "systemctl reload suricata")
+    suri_clock_offset_ms: float = float(os.getenv("SURICATA_CLOCK_OFFSET_MS", "0"))
+
+    latency_watch: bool = os.getenv("LATENCY_WATCH", "1") == "1"
+    latency_wait: float = float(os.getenv("LATENCY_WAIT", "5"))
+    latency_window: float = float(os.getenv("LATENCY_WINDOW", "30"))
+    latency_regression: float = float(os.getenv("LATENCY_REGRESSION", "1.5"))
 
     git_token: str = os.getenv("GIT_WEBHOOK_TOKEN", "")
 